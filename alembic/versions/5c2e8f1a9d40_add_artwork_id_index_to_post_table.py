@@ -0,0 +1,35 @@
+"""Add artwork_id index to Post table
+
+Revision ID: 5c2e8f1a9d40
+Revises: 983997dbb0e4
+Create Date: 2026-10-15 12:41:07.284913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c2e8f1a9d40"
+down_revision = "983997dbb0e4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_post_artwork_id",
+            "post",
+            ["artwork_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_post_artwork_id",
+            table_name="post",
+            postgresql_concurrently=True,
+        )
@@ -5,6 +5,7 @@
 
 # create engine
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 
 # load .env file & get config
 load_dotenv()
@@ -12,8 +13,32 @@
 # database connection string
 DB_URI = os.environ["SB_CNT"].format(password=os.environ["SB_PSW"])
 
+# connection pool settings, sqlite pools don't take them
+pool_settings = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pool_use_lifo": True,
+}
+
+# parsed connection string
+db_url = make_url(DB_URI)
+
+# psycopg2 batches executemany updates and deletes too
+dialect_settings = (
+    {"executemany_mode": "values_plus_batch"}
+    if db_url.get_driver_name() == "psycopg2"
+    else {}
+)
+
 # session settings
 engine = create_engine(
     DB_URI,
     future=True,
+    pool_pre_ping=True,
+    # rows per multi-row INSERT when bulk inserting
+    insertmanyvalues_page_size=int(os.getenv("SQL_IMV_PAGE_SIZE", "1000")),
+    **(pool_settings if db_url.get_backend_name() != "sqlite" else {}),
+    **dialect_settings,
 )
@@ -1,9 +1,12 @@
-import json
 import logging
 
 from pathlib import Path
 
+# fast json serialization
+import orjson
+
 # working with database
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 # database engine
@@ -16,21 +19,6 @@
 log = logging.getLogger("yaminuichan.dumper")
 
 
-def row2dict(row) -> dict:
-    """Convert table rows to dictionary
-
-    Args:
-        row (_type_): a row of table
-
-    Returns:
-        dict: row as dictionary
-    """
-    return {
-        column.name: getattr(row, column.name)
-        for column in row.__table__.columns
-    }
-
-
 def dumper(table, filename: str) -> None:
     """Helper function for dumping tables into files
 
@@ -40,14 +28,18 @@ def dumper(table, filename: str) -> None:
     """
     log.info("Dumping %s...", table.__class__)
     dst = Path(".dump")
-    with Session(engine) as s:
-        (dst / filename).with_suffix(".json").write_text(
-            json.dumps(
-                [row2dict(obj) for obj in s.query(table)],
-                indent=4,
-                default=str,
-            )
-        )
+    with Session(engine) as s, open(
+        (dst / filename).with_suffix(".json"), "wb"
+    ) as f:
+        # stream rows as json array items, one per line
+        rows = s.execute(
+            select(table.__table__).execution_options(yield_per=5000)
+        ).mappings()
+        f.write(b"[")
+        for i, row in enumerate(rows):
+            f.write(b",\n" if i else b"\n")
+            f.write(orjson.dumps(dict(row)))
+        f.write(b"\n]\n")
 
 
 def dump_db() -> None:
@@ -1,17 +1,17 @@
-import json
 import logging
 
 from pathlib import Path
+from datetime import datetime, timezone
 
-# working with database
-from sqlalchemy import func
-from sqlalchemy.orm import Session, aliased
+# fast json parsing
+import orjson
 
-# working with timezone
-from dateutil import tz
+# streaming large exports
+import ijson
 
-# parsing datetime
-from dateutil.parser import parse
+# working with database
+from sqlalchemy import exists, func, insert, select, update
+from sqlalchemy.orm import Session, aliased
 
 # database engine
 from db import engine
@@ -28,6 +28,9 @@
 # get logger
 log = logging.getLogger("yaminuichan.migrate")
 
+# rows per bulk insert
+BATCH_SIZE = 10_000
+
 
 def check_message(message: dict) -> list[Link]:
     """Check if message has appropriate link in it
@@ -50,38 +53,26 @@ def migrate_db() -> None:
     """Read exported jsons and insert data in database"""
     src = Path(".dump")
     log.info("Reading User and Channel json files...")
-    users = json.loads((src / "users.json").read_bytes())
-    channels = json.loads((src / "channels.json").read_bytes())
+    users = orjson.loads((src / "users.json").read_bytes())
+    channels = orjson.loads((src / "channels.json").read_bytes())
     log.info("Done!")
 
     log.info("Inserting Users and Channels to database...")
     with Session(engine) as s:
-        for user in users:
-            forward_mode = user["forward_mode"]
-            user["forward_mode"] = False
-            s.add(User(**user))
-            user["forward_mode"] = user["forward_mode"]
-
-        for channel in channels:
-            s.add(Channel(**channel))
-
-        for user in users:
-            s.get(User, user["id"]).forward_mode = user["forward_mode"]
+        # dumped rows are already valid, channels need their admins first
+        s.execute(insert(User), users)
+        s.execute(insert(Channel), channels)
         s.commit()
     log.info("Done!")
 
     log.info("Inserting Posts and ArtWorks to database...")
-    artposts = json.loads((src / "artworks.json").read_bytes())
-    with Session(engine) as s:
-        for artpost in artposts:
+    with Session(engine) as s, open(src / "artworks.json", "rb") as f:
+        # artworks already in database and added below, by aid and type
+        arts = {(a.aid, a.type): a for a in s.query(ArtWork)}
+        for artpost in ijson.items(f, "item"):
             # adding artwork...
             # check if it's already in database
-            if (
-                a := s.query(ArtWork)
-                .filter_by(aid=artpost["aid"])
-                .filter_by(type=artpost["type"])
-                .first()
-            ):
+            if a := arts.get((artpost["aid"], artpost["type"])):
                 log.info("Found artwork: %s.", a.aid)
                 if artpost["files"] and not a.files:
                     log.info("No-files artwork: %s.", a.aid)
@@ -94,6 +85,7 @@ def migrate_db() -> None:
                         files=artpost["files"],
                     )
                 )
+                arts[(a.aid, a.type)] = a
                 log.info("Added artwork: %s.", a.aid)
             # adding post...
             post_data = {
@@ -113,16 +105,22 @@ def migrate_db() -> None:
 
     log.info("Finding all not first-posted ArtWorks...")
     with Session(engine) as s:
-        for artwork in (
-            s.query(ArtWork)
-            .select_from(ArtWork)
-            .join(Post)
-            .group_by(ArtWork.id)
-            .having(func.count(ArtWork.posts) > 1)
-            .all()
-        ):
-            for post in sorted(artwork.posts, key=lambda x: x.post_date)[1:]:
-                post.is_original = False
+        # number posts of each artwork by date, first one is original
+        ranked = select(
+            Post.id,
+            func.row_number()
+            .over(
+                partition_by=Post.artwork_id,
+                order_by=(Post.post_date, Post.id),
+            )
+            .label("rn"),
+        ).subquery()
+        s.execute(
+            update(Post)
+            .where(Post.id.in_(select(ranked.c.id).where(ranked.c.rn > 1)))
+            .values(is_original=False)
+            .execution_options(synchronize_session=False)
+        )
         s.commit()
     log.info("Done!")
 
@@ -131,18 +129,14 @@ def old_migrate_db() -> None:
     """Read exported jsons and insert data in database"""
     src = Path(".src")
     log.info("Reading User and Channel json files...")
-    users = json.loads((src / "users.json").read_bytes())
-    channels = json.loads((src / "channels.json").read_bytes())
+    users = orjson.loads((src / "users.json").read_bytes())
+    channels = orjson.loads((src / "channels.json").read_bytes())
     log.info("Done!")
 
     log.info("Inserting Users and Channels to database...")
     with Session(engine) as s:
-        for user in users:
-            s.add(User(**user))
-        s.commit()
-
-        for channel in channels:
-            s.add(Channel(**channel))
+        s.execute(insert(User), users)
+        s.execute(insert(Channel), channels)
         s.commit()
     log.info("Done!")
 
@@ -151,52 +145,60 @@ def old_migrate_db() -> None:
     log.info("Getting Channel list...")
     with Session(engine) as s:
         chans = {str(channel.cid): channel for channel in s.query(Channel)}
+    # forwarded channels are looked up by name
+    chan_by_name = {channel.name: channel for channel in chans.values()}
     log.info("Done!")
 
     log.info("Inserting ArtWorks to database...")
     for path in dirs:
         channel = chans[path.name]
-        messages = json.loads((path / "result.json").read_bytes())["messages"]
-        with Session(engine) as s:
+        with Session(engine) as s, open(path / "result.json", "rb") as f:
             log.info("Channel: %s...", channel.name)
-            for message in messages:
+            rows = []
+            for message in ijson.items(f, "messages.item"):
                 data = {
                     "post_id": message["id"],
-                    "post_date": parse(message["date"]).astimezone(tz.tzutc()),
-                    "channel": channel,
+                    "post_date": datetime.fromisoformat(
+                        message["date"]
+                    ).astimezone(timezone.utc),
+                    "channel_id": channel.id,
                 }
+                if ch := message.get("forwarded_from", None):
+                    fwd = chan_by_name.get(ch)
+                    data.update(
+                        {
+                            "is_forwarded": True,
+                            "is_original": False,
+                            "forwarded_channel_id": fwd.id if fwd else None,
+                        }
+                    )
                 for artwork in check_message(message):
-                    data.update({"aid": artwork.id, "type": artwork.type})
-                    if ch := message.get("forwarded_from", None):
-                        data.update(
-                            {
-                                "is_forwarded": True,
-                                "is_original": False,
-                                "forwarded_channel": s.query(Channel)
-                                .filter(Channel.name == ch)
-                                .first(),
-                            }
-                        )
-                    s.add(ArtWork(**data))
-            channel.last_post = messages[-1]["id"]
+                    rows.append(
+                        data | {"aid": artwork.id, "type": artwork.type}
+                    )
+                if len(rows) >= BATCH_SIZE:
+                    s.bulk_insert_mappings(ArtWork, rows)
+                    rows.clear()
+            if rows:
+                s.bulk_insert_mappings(ArtWork, rows)
             s.commit()
     log.info("Done!")
 
     log.info("Finding all not first-posted ArtWorks...")
     with Session(engine) as s:
-        artl, artr = aliased(ArtWork), aliased(ArtWork)
-        q = (
-            s.query(artr)
-            .join(
-                artl,
-                (artl.aid == artr.aid)
-                & (artl.type == artr.type)
-                & (artl.id != artr.id)
-                & (artl.post_date < artr.post_date),
+        artl = aliased(ArtWork)
+        s.execute(
+            update(ArtWork)
+            .where(
+                exists().where(
+                    (artl.aid == ArtWork.aid)
+                    & (artl.type == ArtWork.type)
+                    & (artl.id != ArtWork.id)
+                    & (artl.post_date < ArtWork.post_date)
+                )
             )
-            .order_by(artl.type, artl.aid, artl.post_date)
+            .values(is_original=False)
+            .execution_options(synchronize_session=False)
         )
-        for post in q.all():
-            post.is_original = False
         s.commit()
     log.info("Done!")
@@ -1,6 +1,7 @@
 """Database"""
 from sqlalchemy import (
     UniqueConstraint,
+    Index,
     ForeignKey,
     Integer,
     Column,
@@ -187,6 +188,8 @@ class Post(Base):
     __table_args__ = (
         # no double posts
         UniqueConstraint("channel_id", "post_id", name="uix_post"),
+        # fast lookup of artwork posts
+        Index("ix_post_artwork_id", "artwork_id"),
     )
 
 
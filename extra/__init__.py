@@ -6,6 +6,11 @@
 # working with env
 from dotenv import load_dotenv
 
+# http requests
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 # load .env file
 load_dotenv()
 
@@ -55,34 +60,61 @@ def validate(cls, value: int):
 # link dictionary
 link_dict = {
     "twitter": {
-        "re": r"""(?x)
+        "re": re.compile(
+            r"""
             (?:
                 (?:www\.)?
                 (?:twitter\.com\/)
-                (?P<author>.+?)\/
+                (?P<author>\w+|i\/web)\/
                 (?:status(?:es)?\/)
             )
             (?P<id>\d+)
-        """,
+            """,
+            re.X,
+        ),
         "link": "https://twitter.com/{author}/status/{id}",
-        "full": "https://pbs.twimg.com/media/{id}?format={format}&name=orig",
+        "full": "https://pbs.twimg.com/media/{0}?format={1}&name=orig",
         "type": LinkType.TWITTER,
     },
     "pixiv": {
-        "re": r"""(?x)
+        "re": re.compile(
+            r"""
             (?:
                 (?:www\.)?
                 (?:pixiv\.net\/)
-                (?:\w{2}\/)?
+                (?:[a-z]{2}\/)?
                 (?:artworks\/)
             )
             (?P<id>\d+)
-        """,
+            """,
+            re.X,
+        ),
         "link": "https://www.pixiv.net/artworks/{id}",
         "type": LinkType.PIXIV,
     },
 }
 
+# all link expressions in one, group names are prefixed with link key
+link_regex = re.compile(
+    "|".join(
+        "(?P<{0}>{1})".format(
+            key,
+            re.sub(r"\(\?P<(\w+)>", f"(?P<{key}_\\1>", value["re"].pattern),
+        )
+        for key, value in link_dict.items()
+    ),
+    re.X,
+)
+
+# prefixed link_regex group names to format args, per link key
+link_groups = {
+    key: {f"{key}_{name}": name for name in value["re"].groupindex}
+    for key, value in link_dict.items()
+}
+
+# substrings every link contains, checked before running link_regex
+link_hosts = ("twitter.com/", "pixiv.net/")
+
 # user data dictionary
 @dataclass
 class UserData:
@@ -122,6 +154,17 @@ def validate(cls, value: chr):
     "Accept-Language": "en-US,en;q=0.5",
 }
 
+# shared http session, keeps connections to api and media hosts alive
+http_session = requests.Session()
+http_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=2, backoff_factor=0.2),
+    ),
+)
+
 
 # helper dictionary
 switcher = {
@@ -136,6 +179,78 @@ def validate(cls, value: chr):
     "`\\[` *????????????????????\\.* `\\]`",
 ]
 
+# animated media types
+video_types = frozenset(("video", "animated_gif"))
+
+# caption templates by link type and style: (template, text only)
+caption_dict = {
+    LinkType.PIXIV: {
+        PixivStyle.IMAGE_LINK: ("{link}", False),
+        PixivStyle.IMAGE_INFO_LINK: ("{title} \\| {user}\n{link}", False),
+        PixivStyle.IMAGE_INFO_EMBED_LINK: (
+            "[{title} \\| {user}]({link})",
+            False,
+        ),
+        PixivStyle.IMAGE_INFO_EMBED_LINK_DESC: (
+            "[{user} \\| @{username}]({link})\n\n*{title}*\n\n{desc}",
+            False,
+        ),
+        PixivStyle.INFO_LINK: ("{title} \\| {user}\n{link}", True),
+        PixivStyle.INFO_EMBED_LINK: ("[{title} \\| {user}]({link})", True),
+    },
+    LinkType.TWITTER: {
+        TwitterStyle.LINK: ("{link}", True),
+        TwitterStyle.IMAGE_LINK: ("{link}", False),
+        TwitterStyle.IMAGE_LINK_DESC: ("{link}\n\n{desc}", False),
+        TwitterStyle.IMAGE_INFO_EMBED_LINK: (
+            "[{user} \\| @{username}]({link})",
+            False,
+        ),
+        TwitterStyle.IMAGE_INFO_EMBED_LINK_DESC: (
+            "[{user} \\| @{username}]({link})\n\n{desc}",
+            False,
+        ),
+    },
+}
+
+# style demonstrations by link type and style
+demo_dict = {
+    LinkType.PIXIV: {
+        PixivStyle.IMAGE_LINK: "\\[ `Image(s)` \\]\n\nLink",
+        PixivStyle.IMAGE_INFO_LINK: (
+            "\\[ `Image(s)` \\]\n\nTitle \\| Author\nLink"
+        ),
+        PixivStyle.IMAGE_INFO_EMBED_LINK: (
+            "\\[ `Image(s)` \\]\n\n"
+            "[Title \\| Author](https://www\\.pixiv\\.net/)"
+        ),
+        PixivStyle.IMAGE_INFO_EMBED_LINK_DESC: (
+            "\\[ `Image(s)` \\]\n\n"
+            "[Author \\| @Username](https://www\\.pixiv\\.net/)\n\n"
+            "*Title*\n\nDescription"
+        ),
+        PixivStyle.INFO_LINK: "Artwork \\| Author\nLink",
+        PixivStyle.INFO_EMBED_LINK: (
+            "[Artwork \\| Author](https://www\\.pixiv\\.net/)"
+        ),
+    },
+    LinkType.TWITTER: {
+        TwitterStyle.LINK: "Link",
+        TwitterStyle.IMAGE_LINK: "\\[ `Image(s)` \\]\n\nLink",
+        TwitterStyle.IMAGE_LINK_DESC: (
+            "\\[ `Image(s)` \\]\n\nLink\n\nDescription"
+        ),
+        TwitterStyle.IMAGE_INFO_EMBED_LINK: (
+            "\\[ `Image(s)` \\]\n\n"
+            "[Author \\| @Username](https://twitter\\.com/)"
+        ),
+        TwitterStyle.IMAGE_INFO_EMBED_LINK_DESC: (
+            "\\[ `Image(s)` \\]\n\n"
+            "[Author \\| @Username](https://twitter\\.com/)\n\nDescription"
+        ),
+    },
+}
+
 # pixiv regex
 pixiv_regex = re.compile(r"^((?:\d+)(?:-\d+)?[.,\s]*){1,10}$")
 pixiv_number = re.compile(r"((?P<n1>\d+)(?:-(?P<n2>\d+))?)")
@@ -144,7 +259,16 @@ def validate(cls, value: chr):
 telegram_link = "t.me/c/{cid}/{post_id}"
 
 # filename pattern
-file_pattern = r".*\/(?P<name>.*?)((\?.*format\=)|(\.))(?P<format>\w+).*$"
+file_pattern = re.compile(
+    r".*\/(?P<name>.*?)((\?.*format\=)|(\.))(?P<format>\w+).*$"
+)
 
 # twitter link id
-twitter_regex = r"(?:.*\/(?P<id>.+)(?:\.|\?f))"
+twitter_regex = re.compile(r"(?:.*\/(?P<id>.+)(?:\.|\?f))")
+
+# markdown v2 special characters
+markdown_escape = re.compile(r"([_*\[\]()~`>#+\-=|{}.!])")
+
+# markdown v2 link targets and markup, dropped when telegram parses text
+markdown_link = re.compile(r"\]\((?:\\.|[^)\\])*\)")
+markdown_markup = re.compile(r"\\(.)|[*_~|`\[\]]")
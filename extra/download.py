@@ -1,7 +1,10 @@
-import re
 import logging
 
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from functools import partial
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
 
 # http requests
 import requests
@@ -15,6 +18,9 @@
 # link types, fake headers, file pattern
 from extra import LinkType, fake_headers, file_pattern
 
+# ArtWorkMedia
+from extra.namedtuples import ArtWorkMedia
+
 # get logger
 log = logging.getLogger("yaminuichan.download")
 
@@ -24,18 +30,76 @@
 # shrinked max image side length
 IM_SHR = (2240, 2240)
 
+# download chunk size
+CHUNK_SIZE = 1 << 16
+
+# max parallel downloads
+DL_WORKERS = 8
+
+
+def download_file(
+    link: str,
+    session: requests.Session,
+    *,
+    folder: Path,
+    full: bool = True,
+    resize: bool = False,
+) -> Path | None:
+    """Download single file and resize it if needed
+
+    Args:
+        link (str): downloadable file
+        session (requests.Session): shared http session
+        folder (Path): folder to save file in
+        full (bool, optional): keep full size or not. Defaults to True.
+        resize (bool, optional): file can be resized. Defaults to False.
+
+    Returns:
+        Path | None: downloaded file
+    """
+    reg = file_pattern.search(link)
+    if not reg:
+        return log.error("Couldn't get name or format: %s.", link)
+    with session.get(link, stream=True, allow_redirects=True) as media:
+        chunks = media.iter_content(CHUNK_SIZE)
+        head = next(chunks, b"")
+        name = f"{reg['name']}.{mfb(head, mime=True).split('/')[1]}"
+        file = folder / name
+        with file.open("wb") as f:
+            f.write(head)
+            for chunk in chunks:
+                f.write(chunk)
+    if not full and resize:
+        try:
+            im = Image.open(file)
+            log.debug("Original size: %d x %d.", *im.size)
+            log.debug("Fitting into %d x %d...", *IM_MAX)
+            im.thumbnail(IM_MAX)
+            log.debug("New size: %d x %d.", *im.size)
+            im.save(file, format="webp", lossless=True, optimize=True)
+            if (size := file.stat().st_size) > 10 << 20:
+                log.warning("File is bigger 10 MB: %d.", size)
+                # shrink already resized image further
+                log.debug("Fitting into %d x %d...", *IM_SHR)
+                im.thumbnail(IM_SHR)
+                log.debug("New size: %d x %d.", *im.size)
+                im.save(file, format="webp", lossless=True, optimize=True)
+        except Exception as ex:
+            log.error("Exception occured: %s.", ex)
+    return file
+
 
 def download_media(
-    info: dict,
+    info: ArtWorkMedia,
     *,
     full: bool = True,
     order: list[int] = None,
 ) -> Path | None:
-    """Download files using art media dictionary depending on order list and
+    """Download files using artwork object depending on order list and
     yield downloaded files in full size or resized to 1280px at max size
 
     Args:
-        info (dict): art media dictionary
+        info (ArtWorkMedia): artwork object
         full (bool, optional): yield full size or not. Defaults to True.
         order (list[int], optional): which artworks to upload. Defaults to None.
 
@@ -44,7 +108,7 @@ def download_media(
     """
     if not info:
         return log.error("No info supplied.")
-    if info["type"] == LinkType.PIXIV:
+    if info.type == LinkType.PIXIV:
         headers = {
             "user-agent": "PixivIOSApp/7.13.3 (iOS 14.6; iPhone13,2)",
             "app-os-version": "14.6",
@@ -54,42 +118,22 @@ def download_media(
         }
     else:
         headers = fake_headers
-    links = []
     if order:
-        links = [info["links"][index - 1] for index in order]
-    elif len(info["links"]) <= 10:
-        links = info["links"]
+        links = [info.links[index - 1] for index in order]
     else:
-        links = info["links"][:10]
-    for link in links:
-        media = requests.get(
-            link,
-            headers=headers,
-            allow_redirects=True,
+        links = info.links[:10]
+    # own folder, concurrent downloads of the same artwork don't collide
+    with TemporaryDirectory(prefix="media.") as folder:
+        fetch = partial(
+            download_file,
+            folder=Path(folder),
+            full=full,
+            resize=info.media in ["illust", "photo"],
         )
-        reg = re.search(file_pattern, link)
-        if not reg:
-            log.error("Couldn't get name or format: %s.", link)
-            continue
-        name = f"{reg['name']}.{mfb(media.content, mime=True).split('/')[1]}"
-        file = Path(name)
-        file.write_bytes(media.content)
-        if not full and info["media"] in ["illust", "photo"]:
-            try:
-                im = Image.open(file)
-                log.debug("Original size: %d x %d.", *im.size)
-                log.debug("Fitting into %d x %d...", *IM_MAX)
-                im.thumbnail(IM_MAX)
-                log.debug("New size: %d x %d.", *im.size)
-                im.save(file, format="webp", lossless=True, optimize=True)
-                if (size := file.stat().st_size) > 10 << 20:
-                    log.warning("File is bigger 10 MB: %d.", size)
-                    file.write_bytes(media.content)
-                    im = Image.open(file)
-                    log.debug("Fitting into %d x %d...", *IM_SHR)
-                    im.thumbnail(IM_SHR)
-                    log.debug("New size: %d x %d.", *im.size)
-                    im.save(file, format="webp", lossless=True, optimize=True)
-            except Exception as ex:
-                log.error("Exception occured: %s.", ex)
-        yield file
+        with requests.Session() as session, ThreadPoolExecutor(
+            max_workers=DL_WORKERS
+        ) as pool:
+            session.headers.update(headers)
+            for file in pool.map(fetch, links, repeat(session)):
+                if file:
+                    yield file
@@ -1,6 +1,7 @@
-import re
 import logging
 
+from concurrent.futures import ThreadPoolExecutor
+
 # http requests
 import requests
 
@@ -8,7 +9,11 @@
 from extra import (
     LinkType,
     link_dict,
+    link_regex,
+    link_groups,
+    link_hosts,
     fake_headers,
+    http_session,
     twitter_regex,
     telegram_link,
 )
@@ -26,11 +31,11 @@
 log = logging.getLogger("yaminuichan.helper")
 
 
-def extract_media_ids(art: dict) -> list[str]:
-    if art["type"] == LinkType.TWITTER:
-        return [re.search(twitter_regex, link)["id"] for link in art["links"]]
-    if art["type"] == LinkType.PIXIV:
-        return [str(art["id"])]
+def extract_media_ids(art: ArtWorkMedia) -> list[str]:
+    if art.type == LinkType.TWITTER:
+        return [twitter_regex.search(link)["id"] for link in art.links]
+    if art.type == LinkType.PIXIV:
+        return [str(art.id)]
     return None
 
 
@@ -45,14 +50,23 @@ def formatter(query: str) -> list[Link]:
     """
     if not query:
         return None
+    # no link can match without its host
+    if not any(host in query for host in link_hosts):
+        return []
     response = []
-    for re_key, re_type in link_dict.items():
-        for link in re.finditer(re_type["re"], query):
-            # dictionary keys = format args
-            _link = re_type["link"].format(**link.groupdict())
+    info = log.isEnabledFor(logging.INFO)
+    for link in link_regex.finditer(query):
+        re_key = link.lastgroup
+        re_type = link_dict[re_key]
+        # group names without link key prefix = format args
+        args = {
+            arg: link.group(name) for name, arg in link_groups[re_key].items()
+        }
+        _link = re_type["link"].format(**args)
+        if info:
             log.info("Formatter: Received %s link: %r.", re_key, _link)
-            # add to response list
-            response.append(Link(re_type["type"], _link, int(link.group("id"))))
+        # add to response list
+        response.append(Link(re_type["type"], _link, int(args["id"])))
     return response
 
 
@@ -66,7 +80,7 @@ def get_file_size(link: str, session: requests.Session = None) -> int:
         int: size of file
     """
     if not session:
-        session = requests
+        session = http_session
     r = session.head(
         url=link,
         headers=fake_headers,
@@ -86,5 +100,20 @@ def get_links(media: Link) -> ArtWorkMedia:
     return None
 
 
+def get_links_batch(links: list[Link]) -> list[ArtWorkMedia]:
+    """Get artwork objects for several links concurrently
+
+    Args:
+        links (list[Link]): links to fetch
+
+    Returns:
+        list[ArtWorkMedia]: artwork objects in the same order
+    """
+    if len(links) < 2:
+        return [get_links(link) for link in links]
+    with ThreadPoolExecutor(max_workers=min(len(links), 8)) as pool:
+        return list(pool.map(get_links, links))
+
+
 def get_post_link(cid: int, post_id: int) -> str:
     return telegram_link.format(cid=-(cid + 10**12), post_id=post_id)
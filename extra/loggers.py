@@ -1,6 +1,10 @@
 import os
+import queue
+import atexit
 import logging
 
+from logging.handlers import QueueHandler, QueueListener
+
 from pathlib import Path
 from datetime import datetime
 
@@ -10,8 +14,7 @@
 # reading setings
 import tomli
 
-# current timestamp & this file directory
-date_run = datetime.now()
+# this file directory
 file_dir = Path(__file__).parent.parent
 
 ################################################################################
@@ -48,7 +51,7 @@ def get_file_handler() -> logging.FileHandler | None:
                 root_log.error("Exception occured: %s.", ex)
                 root_log.info("Can't execute program.")
                 quit()
-        log_date = date_run.strftime(file_log["date"])
+        log_date = datetime.now().strftime(file_log["date"])
         log_name = f'{file_log["pref"]}{log_date}.log'
         log_file = log_dir / log_name
         root_log.info("Logging to file: %r.", log_name)
@@ -64,6 +67,22 @@ def get_file_handler() -> logging.FileHandler | None:
 # get file handler
 file_handler = get_file_handler()
 
+# log records queue, emptied by listener thread
+log_queue = queue.Queue(-1)
+
+# write to file in background so logging calls only enqueue records
+if file_handler:
+    queue_handler = QueueHandler(log_queue)
+    log_listener = QueueListener(
+        log_queue,
+        file_handler,
+        respect_handler_level=True,
+    )
+    log_listener.start()
+    atexit.register(log_listener.stop)
+else:
+    queue_handler = log_listener = None
+
 
 def add_file_handler(logger: logging.Logger | str) -> None:
     """Add file handler to logger
@@ -75,8 +94,8 @@ def add_file_handler(logger: logging.Logger | str) -> None:
         root_log.error("No logger to add file handler to.")
     if not isinstance(logger, logging.Logger):
         logger = logging.getLogger(name)
-    if file_handler:
-        logger.addHandler(file_handler)
+    if queue_handler:
+        logger.addHandler(queue_handler)
 
 
 # setup root logger
@@ -26,5 +26,7 @@
         "desc",
         "links",
         "thumbs",
+        "message_id",
     ],
+    defaults=[None, None],
 )
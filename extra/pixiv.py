@@ -2,17 +2,16 @@
 import os
 import logging
 
+from threading import Lock
+
 # working with env
 from dotenv import load_dotenv
 
 # pixiv api
 from pixivpy3 import AppPixivAPI
 
-# http requests
-import requests
-
-# link types, link dictionary
-from extra import LinkType, link_dict
+# link types, link dictionary, http session
+from extra import LinkType, link_dict, http_session
 
 # ArtWorkMedia
 from extra.namedtuples import ArtWorkMedia
@@ -29,6 +28,13 @@
 # get logger
 log = logging.getLogger("yaminuichan.pixiv")
 
+# pixiv api client, authenticated once and on token refresh
+pixiv_client = AppPixivAPI()
+pixiv_client.set_auth(pixiv_api["ACCESS_TOKEN"], pixiv_api["REFRESH_TOKEN"])
+
+# only one handler refreshes an expired token
+token_lock = Lock()
+
 ################################################################################
 # pixiv
 ################################################################################
@@ -78,7 +84,7 @@ def get_pixiv_token(refresh_token: str) -> list[str, str]:
     Returns:
         list[str, str]: access and refresh token
     """
-    res = requests.post(
+    res = http_session.post(
         url="https://oauth.secure.pixiv.net/auth/token",
         headers={
             "User-Agent": "PixivIOSApp/7.13.3 (iOS 14.6; iPhone13,2)",
@@ -110,29 +116,34 @@ def get_pixiv_links(pixiv_id: int) -> ArtWorkMedia:
     Returns:
         ArtWorkMedia: artwork object
     """
-    log.debug("Starting Pixiv API client...")
-    api = AppPixivAPI()
     tries = 0
     while tries < 3:
-        log.debug("Setting authentication...")
-        api.set_auth(pixiv_api["ACCESS_TOKEN"], pixiv_api["REFRESH_TOKEN"])
         log.debug("Trying to fetch artwork...")
-        json_result = api.illust_detail(pixiv_id)
+        access = pixiv_api["ACCESS_TOKEN"]
+        json_result = pixiv_client.illust_detail(pixiv_id)
         if json_result.error:
             if json_result.error.user_message:
                 log.error("Error: %s", json_result.error.user_message)
                 return None
             else:
                 log.warning("Warning: %s", json_result.error.message)
-                log.debug("Getting new access token...")
-                token = get_pixiv_token(pixiv_api["REFRESH_TOKEN"])
-                if token:
-                    log.debug("Setting new access token...")
-                    pixiv_api["ACCESS_TOKEN"] = token[0]
-                else:
-                    log.warning("Warning: No token received!")
-                    tries += 1
-                    log.debug("Trying again [%s]...", tries)
+                with token_lock:
+                    if pixiv_api["ACCESS_TOKEN"] != access:
+                        log.debug("Access token was already refreshed.")
+                        continue
+                    log.debug("Getting new access token...")
+                    token = get_pixiv_token(pixiv_api["REFRESH_TOKEN"])
+                    if token:
+                        log.debug("Setting new access token...")
+                        pixiv_api["ACCESS_TOKEN"] = token[0]
+                        pixiv_client.set_auth(
+                            pixiv_api["ACCESS_TOKEN"],
+                            pixiv_api["REFRESH_TOKEN"],
+                        )
+                    else:
+                        log.warning("Warning: No token received!")
+                        tries += 1
+                        log.debug("Trying again [%s]...", tries)
         else:
             log.debug("Response: %r.", json_result.illust)
             return get_pixiv_media(json_result.illust)
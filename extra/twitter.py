@@ -6,11 +6,8 @@
 # twitter api
 import tweepy
 
-# http requests
-import requests
-
-# link types, link dictionary, fake headers
-from extra import LinkType, link_dict, fake_headers
+# link types, link dictionary, fake headers, http session
+from extra import LinkType, link_dict, fake_headers, http_session
 
 # import ArtWorkMedia
 from extra.namedtuples import ArtWorkMedia
@@ -18,6 +15,24 @@
 # get logger
 log = logging.getLogger("yaminuichan.twitter")
 
+# twitter api client
+twitter_client = tweepy.Client(os.environ["TW_TOKEN"])
+
+# twitter media link
+media_regex = re.compile(
+    r"""
+    (?:
+        (?:media\/)
+        (?P<id>[^\.\?]+)
+        (?:
+            (?:\?.*format\=)|(?:\.)
+        )
+    )
+    (?P<format>\w+)
+    """,
+    re.X,
+)
+
 ################################################################################
 # twitter
 ################################################################################
@@ -40,27 +55,18 @@ def get_twitter_media(
         list[list[str], list[str]]: media links
     """
     if media_type == "photo":
-        pat = r"""(?x)
-            (?:
-                (?:media\/)
-                (?P<id>[^\.\?]+)
-                (?:
-                    (?:\?.*format\=)|(?:\.)
-                )
-            )
-            (?P<format>\w+)
-        """
         links = []
+        full = link_dict["twitter"]["full"]
         for url in image_list:
-            args = re.search(pat, url).groupdict()
-            links.append(link_dict["twitter"]["full"].format(**args))
+            links.append(
+                full.format(*media_regex.search(url).group("id", "format"))
+            )
         return [links, [link.replace("orig", "large") for link in links]]
     else:
         base = "https://tweetpik.com/twitter-downloader/"
         api = f"https://tweetpik.com/api/tweets/{tweet_id}/video"
         log.debug("Sending request to API: %s...", api)
-        s = requests.session()
-        res = s.post(
+        res = http_session.post(
             url=api,
             headers={
                 **fake_headers,
@@ -87,9 +93,7 @@ def get_twitter_links(tweet_id: int) -> ArtWorkMedia:
     Returns:
         ArtWorkMedia: artwork object
     """
-    log.debug("Starting Twitter API client...")
-    client = tweepy.Client(os.environ["TW_TOKEN"])
-    res = client.get_tweet(
+    res = twitter_client.get_tweet(
         id=tweet_id,
         expansions=[
             "attachments.media_keys",
@@ -3,6 +3,8 @@
 import logging
 
 from pathlib import Path
+from typing import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # http requests
 import requests
@@ -10,8 +12,11 @@
 # upload dictionary
 from extra import upl_dict
 
-# logger file handler
-from extra.loggers import file_handler
+# logger file handler & its queue
+from extra.loggers import file_handler, log_queue
+
+# ArtWorkMedia
+from extra.namedtuples import ArtWorkMedia
 
 # downloading media
 from extra.download import download_media
@@ -19,6 +24,26 @@
 # get logger
 log = logging.getLogger("yaminuichan.upload")
 
+# read chunk size, multiple of 3 to keep base64 chunks joinable
+CHUNK_SIZE = 3 << 16
+
+# background uploads, shut down before uploading log
+upload_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="upload")
+
+
+def encode_file(file: Path) -> Iterator[bytes]:
+    """Read file by chunks and yield them encoded in urlsafe base64
+
+    Args:
+        file (Path): file to encode
+
+    Yields:
+        Iterator[bytes]: encoded chunk
+    """
+    with file.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield base64.urlsafe_b64encode(chunk)
+
 
 def upload(file: Path, link: str, kind: str = "file") -> None:
     """Upload file of certain type to Google Drive
@@ -43,7 +68,7 @@ def upload(file: Path, link: str, kind: str = "file") -> None:
             r = requests.post(
                 url=link,
                 params={"name": name},
-                data=base64.urlsafe_b64encode(file.read_bytes()),
+                data=encode_file(file),
             )
             if r.json()["ok"]:
                 log.info("Done uploading %s %r.", kind, name)
@@ -57,11 +82,13 @@ def upload(file: Path, link: str, kind: str = "file") -> None:
         log.error("Couldn't upload %s %r.", kind, name)
 
 
-def upload_media(info: dict, user: int = 0, order: list[int] = None) -> None:
+def upload_media(
+    info: ArtWorkMedia, user: int = 0, order: list[int] = None
+) -> None:
     """Upload images to cloud
 
     Args:
-        info (dict): art media dictionary
+        info (ArtWorkMedia): artwork object
         user (int, optional): telegram user id. Defaults to 0.
         order (list[int], optional): which artworks to upload. Defaults to None.
     """
@@ -82,10 +109,38 @@ def upload_media(info: dict, user: int = 0, order: list[int] = None) -> None:
         file.unlink()
 
 
+def log_upload_error(future: Future) -> None:
+    """Log exception of background upload
+
+    Args:
+        future (Future): finished upload
+    """
+    if ex := future.exception():
+        log.error("Exception occured: %s.", ex)
+
+
+def submit_upload_media(
+    info: ArtWorkMedia, user: int = 0, order: list[int] = None
+) -> None:
+    """Upload images to cloud in background
+
+    Args:
+        info (ArtWorkMedia): artwork object
+        user (int, optional): telegram user id. Defaults to 0.
+        order (list[int], optional): which artworks to upload. Defaults to None.
+    """
+    if user != upl_dict["user"]:
+        return  # silently exit
+    future = upload_pool.submit(upload_media, info, user, order)
+    future.add_done_callback(log_upload_error)
+
+
 def upload_log() -> None:
     """Upload log file to cloud"""
     if not file_handler:
         return  # silently exit
     if not upl_dict["log"]:
         return log.error("No log upload link.")
+    # wait for queued records to be written
+    log_queue.join()
     upload(Path(file_handler.baseFilename), upl_dict["log"], "log file")
@@ -1,16 +1,28 @@
 """Main module"""
 import os
-import re
+import time
 import logging
 
+from typing import Iterator
+
+from string import Formatter
+from itertools import chain
 from pathlib import Path
-from functools import partial
+from functools import partial, lru_cache
+from threading import Lock
+from collections import OrderedDict
+from weakref import WeakValueDictionary
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor
 
 # working with database
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 
 # telegram core bot api
 from telegram import (
+    Bot,
     InlineKeyboardMarkup,
     Message,
     Update,
@@ -31,15 +43,15 @@
     Filters,
 )
 
+# connection pool size
+from telegram.utils.request import Request
+
 # telegram errors
 from telegram.error import Unauthorized
 
 # telegram constants
 from telegram.constants import PARSEMODE_MARKDOWN_V2 as MDV2
 
-# escaping special markdown characters
-from telegram.utils.helpers import escape_markdown
-
 # database engine
 from db import engine
 
@@ -50,10 +62,14 @@
 from extra import PixivStyle, LinkType, TwitterStyle, UserData
 
 # expressions
-from extra import pixiv_number, pixiv_regex, telegram_link
+from extra import link_hosts, pixiv_number, pixiv_regex, telegram_link
+from extra import markdown_escape, markdown_link, markdown_markup
 
 # dictionaries
-from extra import switcher, result_message
+from extra import switcher, result_message, caption_dict, demo_dict
+
+# media types
+from extra import video_types
 
 # bot states
 from extra import BotState
@@ -62,16 +78,22 @@
 from extra.loggers import root_log
 
 # namedtuples
-from extra.namedtuples import Link
+from extra.namedtuples import ArtWorkMedia, Link
 
 # helpers
-from extra.helpers import formatter, get_links, get_post_link, extract_media_ids
+from extra.helpers import (
+    formatter,
+    get_links,
+    get_links_batch,
+    get_post_link,
+    extract_media_ids,
+)
 
 # downloading media
 from extra.download import download_media
 
 # uploading media
-from extra.upload import upload_media, upload_log
+from extra.upload import submit_upload_media, upload_pool, upload_log
 
 # dumping db
 # from db.dump_db import dump_db
@@ -83,12 +105,123 @@
 log = logging.getLogger("yaminuichan.app")
 sys_log = logging.getLogger("yaminuichan.system")
 
+# bot settings
+TOKEN = os.environ["TOKEN"]
+BOT_ID = int(TOKEN.split(":", 1)[0])
+PORT = int(os.getenv("PORT", "8443"))
+WEBHOOK_URL = f"https://{os.environ['APP_NAME']}.herokuapp.com/{TOKEN}"
+WORKERS = int(os.getenv("BOT_WORKERS", "32"))
+
+# telegram text and caption length limits
+TEXT_MAX = 4096
+CAPTION_MAX = 1024
+
+# help message
+HELP_TEXT = Path(os.environ["HELP_FILE"]).read_text(encoding="utf-8")
+
+# button under duplicate warning
+POST_MARKUP = InlineKeyboardMarkup.from_button(
+    InlineKeyboardButton(text="Post!", callback_data="post")
+)
+
 ################################################################################
 # telegram bot helpers section
 ################################################################################
 
+
+class TokenBucket:
+    """Thread-safe token bucket, callers wait for their turn"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.lock = Lock()
+
+    def acquire(self) -> None:
+        """Take one token, sleep until it's available"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.stamp) * self.rate
+            )
+            self.stamp = now
+            # reserve the token now, wait for it outside the lock
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+# telegram flood limits: messages per second for bot, per chat
+FLOOD_ALL = (30, 30)
+FLOOD_CHAT = (1, 3)
+FLOOD_GROUP = (20 / 60, 20)
+
+# max chats to keep flood limits for
+FLOOD_CHATS_MAX = 1024
+
+
+class LimitedBot(Bot):
+    """Bot waiting for flood limits of the bot and of each chat
+
+    Waiting blocks the sending thread, so every handler that sends messages
+    must run on the worker pool, never on the dispatcher thread.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._all_bucket = TokenBucket(*FLOOD_ALL)
+        self._chat_buckets = OrderedDict()
+        self._chat_lock = Lock()
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        with self._chat_lock:
+            if bucket := self._chat_buckets.get(chat_id):
+                self._chat_buckets.move_to_end(chat_id)
+                return bucket
+            # least recently used chat has long refilled its bucket
+            if len(self._chat_buckets) >= FLOOD_CHATS_MAX:
+                self._chat_buckets.popitem(last=False)
+            # channels and groups have negative ids or usernames
+            isgroup = str(chat_id).startswith(("-", "@"))
+            bucket = TokenBucket(*(FLOOD_GROUP if isgroup else FLOOD_CHAT))
+            self._chat_buckets[chat_id] = bucket
+            return bucket
+
+    def _limited(self, method, *args, **kwargs):
+        chat_id = kwargs.get("chat_id", args[0] if args else None)
+        if chat_id is not None:
+            self._chat_bucket(chat_id).acquire()
+        self._all_bucket.acquire()
+        return method(*args, **kwargs)
+
+    def send_message(self, *args, **kwargs) -> Message:
+        return self._limited(super().send_message, *args, **kwargs)
+
+    def send_media_group(self, *args, **kwargs) -> list[Message]:
+        return self._limited(super().send_media_group, *args, **kwargs)
+
+    def forward_message(self, *args, **kwargs) -> Message:
+        return self._limited(super().forward_message, *args, **kwargs)
+
+
 # escaping markdown v2
-esc = partial(escape_markdown, version=2)
+esc = lru_cache(maxsize=1024)(partial(markdown_escape.sub, r"\\\1"))
+
+
+def parsed_length(text: str) -> int:
+    """Get length of markdown v2 text as telegram counts it
+
+    Args:
+        text (str): text in markdown v2
+
+    Returns:
+        int: length in utf-16 code units without markup
+    """
+    text = markdown_markup.sub(r"\1", markdown_link.sub("]", text))
+    return len(text.encode("utf-16-le")) // 2
 
 
 def rep(update: Update) -> dict:
@@ -123,6 +256,22 @@ def _reply(update: Update, text: str, **kwargs) -> Message:
     )
 
 
+def post_text(text: str, cid: int, pid: int, link: str) -> str:
+    """Get text with link to posted content
+
+    Args:
+        text (str): description of action
+        cid (int): channel internal id
+        pid (int): channel post id
+        link (str): content original link
+
+    Returns:
+        str: text in markdown v2
+    """
+    text, post, link = esc(text), esc(get_post_link(cid, pid)), esc(link)
+    return f"*[Artwork]({link})* was *[{text}]({post})*\\!"
+
+
 def _post(update: Update, text: str, cid: int, pid: int, link: str) -> Message:
     """Reply to current message with link to posted content
 
@@ -136,8 +285,7 @@ def _post(update: Update, text: str, cid: int, pid: int, link: str) -> Message:
     Returns:
         Message: Telegram Message
     """
-    text, post, link = esc(text), esc(get_post_link(cid, pid)), esc(link)
-    _reply(update, f"*[Artwork]({link})* was *[{text}]({post})*\\!")
+    _reply(update, post_text(text, cid, pid, link))
 
 
 def _error(update: Update, text: str, **kwargs) -> Message:
@@ -168,14 +316,12 @@ def _warn(update: Update, link: Link, **kwargs) -> Message:
         Message: Telegram Message
     """
     posted = get_other_links(link.id, link.type)
-    text = ", and ".join([f"[here]({esc(post)})" for post in posted])
+    text = ", and ".join(f"[here]({esc(post)})" for post in posted)
     return update.effective_message.reply_markdown_v2(
         f"This [artwork]({esc(link.link)}) was already posted\\: {text}\\.\n\n"
         "`\\[` ⚠️ *POST IT ANYWAY\\?* ⚠️ `\\]`",
         reply_to_message_id=update.effective_message.message_id,
-        reply_markup=InlineKeyboardMarkup.from_button(
-            InlineKeyboardButton(text="Post!", callback_data="post")
-        ),
+        reply_markup=POST_MARKUP,
         **kwargs,
     )
 
@@ -183,7 +329,7 @@ def _warn(update: Update, link: Link, **kwargs) -> Message:
 def send_post(
     context: CallbackContext,
     *,
-    info: dict = None,
+    info: ArtWorkMedia = None,
     text: str = None,
     **kwargs,
 ) -> Message | None:
@@ -191,14 +337,14 @@ def send_post(
 
     Args:
         context (CallbackContext): current context
-        info (dict): art media dictionary
+        info (ArtWorkMedia): artwork object
         text (str): text to send
 
     Returns:
         Message | None: Telegram Message
     """
     if info:
-        text = esc(info["link"])
+        text = esc(info.link)
     if text:
         return context.bot.send_message(
             text=text,
@@ -210,91 +356,89 @@ def send_post(
 
 def send_media(
     context: CallbackContext,
-    info: dict,
+    info: ArtWorkMedia,
     *,
     order: list[int] = None,
     style: int = None,
+    note: str = None,
+    sent: list[Message] = None,
     **kwargs,
 ) -> Message | None:
     """Send media as media group
 
     Args:
         context (CallbackContext): current context
-        info (dict): art media dictionary
+        info (ArtWorkMedia): artwork object
         order (list[int], optional): which artworks to upload. Defaults to None.
         style (int, optional): pixiv sryle. Defaults to None.
+        note (str, optional): text to add to caption. Defaults to None.
+        sent (list[Message], optional): already sent media group to reuse
+        files from. Defaults to None.
 
     Returns:
         Message | None: Telegram Message
     """
     if not info:
         return log.error("Send Media: No info supplied.")
-    user, username, title, desc, link = (
-        esc(info["user"]),
-        esc(info["username"]),
-        esc(info["title"]),
-        esc(info["desc"]),
-        esc(info["link"]),
+    template, text_only = caption_dict[info.type].get(style, ("{link}", False))
+    # escape only fields used by template
+    caption = template.format(
+        **{
+            name: esc(getattr(info, name))
+            for _, name, _, _ in Formatter().parse(template)
+            if name
+        }
     )
-    caption = ""
-    match info["type"]:
-        case LinkType.PIXIV:
-            match style:
-                case PixivStyle.IMAGE_LINK:
-                    caption = link
-                case PixivStyle.IMAGE_INFO_LINK:
-                    caption = f"{title} \\| {user}\n{link}"
-                case PixivStyle.IMAGE_INFO_EMBED_LINK:
-                    caption = f"[{title} \\| {user}]({link})"
-                case PixivStyle.IMAGE_INFO_EMBED_LINK_DESC:
-                    caption = f"[{user} \\| @{username}]({link})\n\n*{title}*\n\n{desc}"
-                case PixivStyle.INFO_LINK:
-                    caption = f"{title} \\| {user}\n{link}"
-                    return send_post(context, text=caption, **kwargs)
-                case PixivStyle.INFO_EMBED_LINK:
-                    caption = f"[{title} \\| {user}]({link})"
-                    return send_post(context, text=caption, **kwargs)
-                case _:
-                    caption = link
-        case LinkType.TWITTER:
-            match style:
-                case TwitterStyle.LINK:
-                    caption = link
-                    return send_post(context, text=caption, **kwargs)
-                case TwitterStyle.IMAGE_LINK:
-                    caption = link
-                case TwitterStyle.IMAGE_LINK_DESC:
-                    caption = f"{link}\n\n{desc}"
-                case TwitterStyle.IMAGE_INFO_EMBED_LINK:
-                    caption = f"[{user} \\| @{username}]({link})"
-                case TwitterStyle.IMAGE_INFO_EMBED_LINK_DESC:
-                    caption = f"[{user} \\| @{username}]({link})\n\n{desc}"
-                case _:
-                    caption = link
+    if note:
+        noted = f"{caption}\n\n{note}"
+        # send note separately if it doesn't fit
+        if parsed_length(noted) <= (TEXT_MAX if text_only else CAPTION_MAX):
+            caption, note = noted, None
+    # note answers current message
+    note_to = {
+        "chat_id": kwargs.get("chat_id"),
+        "reply_to_message_id": kwargs.get("reply_to_message_id"),
+    }
+    if text_only:
+        posted = send_post(context, text=caption, **kwargs)
+        if note:
+            send_post(context, text=note, **note_to)
+        return posted
     media = []
-    for file in download_media(info, full=False, order=order):
-        match info["media"]:
-            case "video" | "animated_gif":
-                media.append(InputMediaVideo(file.read_bytes()))
-            case _:
-                media.append(InputMediaPhoto(file.read_bytes()))
-        file.unlink()
+    if sent:
+        # files are already on telegram servers
+        for message in sent:
+            if video := message.video or message.animation:
+                media.append(InputMediaVideo(video.file_id))
+            else:
+                media.append(InputMediaPhoto(message.photo[-1].file_id))
+    else:
+        for file in download_media(info, full=False, order=order):
+            match info.media:
+                case "video" | "animated_gif":
+                    media.append(InputMediaVideo(file.read_bytes()))
+                case _:
+                    media.append(InputMediaPhoto(file.read_bytes()))
+            file.unlink()
     media[0].caption = caption
     media[0].parse_mode = MDV2
     # answer to pixiv artwork
-    if "reply_to_message_id" in kwargs and "message_id" in info:
-        kwargs["reply_to_message_id"] = info["message_id"]
-    return context.bot.send_media_group(
+    if "reply_to_message_id" in kwargs and info.message_id:
+        kwargs["reply_to_message_id"] = info.message_id
+    posted = context.bot.send_media_group(
         media=media,
         **kwargs,
     )
+    if note:
+        send_post(context, text=note, **note_to)
+    return posted
 
 
 def send_media_doc(
     context: CallbackContext,
-    info: dict,
+    info: ArtWorkMedia,
     *,
-    media_filter: list[str] = None,
+    media_filter: frozenset[str] = None,
     order: list[int] = None,
     **kwargs,
 ) -> Message | None:
@@ -302,8 +446,9 @@ def send_media_doc(
 
     Args:
         context (CallbackContext): current context
-        info (dict): art media dictionary
-        media_filter (list[str], optional): types to send. Defaults to None.
+        info (ArtWorkMedia): artwork object
+        media_filter (frozenset[str], optional): types to send.
+        Defaults to None.
         order (list[int], optional): which artworks to upload. Defaults to None.
 
     Returns:
@@ -311,7 +456,9 @@ def send_media_doc(
     """
     if not info:
         return log.error("Send Media Doc: No info supplied.")
-    if media_filter and info["media"] not in media_filter:
+    if media_filter and not isinstance(media_filter, (set, frozenset)):
+        media_filter = frozenset(media_filter)
+    if media_filter and info.media not in media_filter:
         return log.debug("Send Media Doc: Didn't pass media filter.")
     log.debug("Send Media Doc: Passed media filter.")
     documents = []
@@ -325,8 +472,8 @@ def send_media_doc(
         )
         file.unlink()
     # answer to pixiv artwork
-    if "reply_to_message_id" in kwargs and "message_id" in info:
-        kwargs["reply_to_message_id"] = info["message_id"]
+    if "reply_to_message_id" in kwargs and info.message_id:
+        kwargs["reply_to_message_id"] = info.message_id
     context.bot.send_media_group(
         media=documents,
         **kwargs,
@@ -351,7 +498,7 @@ def notify(
     *,
     command: str = None,
     func: str = None,
-    art: dict = None,
+    art: ArtWorkMedia = None,
     toggle: tuple[str, bool] = None,
 ) -> None:
     """Log that something hapened
@@ -363,6 +510,10 @@ def notify(
         art (ArtWorkMedia, optional): art object. Defaults to None.
         toggle (tuple[str, bool]m optional): toggler info. Defaults to None.
     """
+    # skip building arguments for disabled levels
+    level = logging.INFO if command or art or toggle else logging.DEBUG
+    if not sys_log.isEnabledFor(level):
+        return
     chat = update.effective_chat
     if command:
         sys_log.info(
@@ -383,15 +534,15 @@ def notify(
             "[%d] %r received content: [%02d|%d/%s] %r : %r by [%d/@%s] %r | %s.",
             chat.id,
             chat.full_name or chat.title,
-            art["type"],
-            art["id"],
-            art["media"],
-            art["title"] if art["title"] else "×",
-            art["desc"],
-            art["user_id"],
-            art["username"],
-            art["user"],
-            art["date"],
+            art.type,
+            art.id,
+            art.media,
+            art.title if art.title else "×",
+            art.desc,
+            art.user_id,
+            art.username,
+            art.user,
+            art.date,
         )
     if toggle:
         sys_log.info(
@@ -419,21 +570,26 @@ def channel_check(update: Update, context: CallbackContext) -> int | None:
             _error(update, "This message is from a supergroup\\.")
             return log.error("Channel: This message is from a supergroup.")
         with Session(engine) as s:
-            if (c := s.get(Channel, channel.id)) and c.admin:
+            if (c := s.get(Channel, channel.id)) and c.admin_id:
                 _error(update, "This channel is *already* owned\\.")
                 return log.error("Channel: [%s] is already owned.", channel.id)
         _reply(
             update,
             "*Seems fine\\!* ✨\nChecking for *admin rights*\\.\\.\\.",
         )
-        bot_id = int(os.getenv("TOKEN").split(":")[0])
         chat_id = update.effective_chat.id
         chan_id = channel.id
         try:
+            # both checks are independent, ask for them at once
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                _bot, _user = pool.map(
+                    partial(context.bot.get_chat_member, chan_id),
+                    (BOT_ID, chat_id),
+                )
             if not (
-                (_bot := context.bot.get_chat_member(chan_id, bot_id))
-                and getattr(_bot, "can_post_messages")
-                and (_user := context.bot.get_chat_member(channel.id, chat_id))
+                _bot
+                and _bot.can_post_messages
+                and _user
                 and _user.status in ["creator", "administrator"]
             ):
                 _error(
@@ -479,20 +635,120 @@ def channel_check(update: Update, context: CallbackContext) -> int | None:
 ################################################################################
 
 
-def get_artwork(aid: int, type: int) -> ArtWork:
+def get_artwork(aid: int, type: int, session: Session = None) -> ArtWork:
     """Gets artwork if it is already in database
 
     Args:
         aid (int): artwork id
         type (int): artwork type
+        session (Session, optional): open session to reuse. Defaults to None.
 
     Returns:
         ArtWork: found artwork
     """
+    if session:
+        return session.query(ArtWork).filter_by(aid=aid, type=type).first()
     with Session(engine) as s:
         return s.query(ArtWork).filter_by(aid=aid, type=type).first()
 
 
+# artworks known to be in database, they are never deleted
+known_artworks = set()
+
+# max known artworks to remember
+KNOWN_MAX = 4096
+
+
+def artwork_exists(aid: int, type: int) -> bool:
+    """Check if artwork is already in database without loading it
+
+    Args:
+        aid (int): artwork id
+        type (int): artwork type
+
+    Returns:
+        bool: True if artwork exists
+    """
+    if (aid, type) in known_artworks:
+        return True
+    with Session(engine) as s:
+        exists = (
+            s.execute(
+                select(ArtWork.id)
+                .where(ArtWork.aid == aid, ArtWork.type == type)
+                .limit(1)
+            ).first()
+            is not None
+        )
+    # only positive answers can't go stale
+    if exists:
+        if len(known_artworks) >= KNOWN_MAX:
+            known_artworks.clear()
+        known_artworks.add((aid, type))
+    return exists
+
+
+# locks of artworks being posted right now, freed once nobody holds them
+artwork_locks = WeakValueDictionary()
+artwork_locks_lock = Lock()
+
+
+@contextmanager
+def lock_artworks(*keys: tuple[int, int]) -> Iterator[None]:
+    """Hold artworks so that no other handler posts or inserts them meanwhile
+
+    Args:
+        keys (tuple[int, int]): artwork ids and types
+
+    Yields:
+        Iterator[None]: artworks are held
+    """
+    with ExitStack() as stack:
+        # same order for everyone, so handlers can't deadlock
+        for key in sorted(set(keys)):
+            with artwork_locks_lock:
+                lock = artwork_locks.setdefault(key, Lock())
+            stack.enter_context(lock)
+        yield
+
+
+def insert_posts(posts: list[Post]) -> None:
+    """Insert posts at once, one by one if any of them conflicts
+
+    Args:
+        posts (list[Post]): posts already sent to channel
+    """
+    with Session(engine) as s:
+        try:
+            s.add_all(posts)
+            s.commit()
+            return log.info("Post: Inserted %d posts.", len(posts))
+        except IntegrityError as ex:
+            s.rollback()
+            log.warning("Post: Couldn't insert posts at once: %s.", ex)
+    # rolled back posts are transient again and can be added anew
+    for post in posts:
+        with Session(engine) as s:
+            try:
+                s.add(post)
+                s.commit()
+                continue
+            except IntegrityError as ex:
+                s.rollback()
+                log.warning("Post: Couldn't insert post: %s.", ex)
+            # artwork was inserted meanwhile, attach post to it
+            if not (a := get_artwork(post.artwork.aid, post.artwork.type, s)):
+                log.error("Post: Skipped post %d: no artwork.", post.post_id)
+                continue
+            post.artwork, post.is_original = a, False
+            try:
+                s.add(post)
+                s.commit()
+            except IntegrityError as ex:
+                s.rollback()
+                log.error("Post: Skipped post %d: %s.", post.post_id, ex)
+
+
 def get_other_links(aid: int, type: int) -> list[str]:
     """Get already posted instances of artwork
 
@@ -504,36 +760,38 @@ def get_other_links(aid: int, type: int) -> list[str]:
         list[str]: list of links to posts
     """
     with Session(engine) as s:
-        return [
-            telegram_link.format(**item)
-            for item in (
-                s.query(Post.post_id, Channel.cid)
-                .filter(Post.channel_id == Channel.id)
-                .filter(Post.artwork == get_artwork(aid, type))
-                .order_by(Post.post_date.asc())
-                .all()
-            )
-        ]
+        rows = s.execute(
+            select(Post.post_id, Channel.cid)
+            .join(Channel, Post.channel_id == Channel.id)
+            .join(ArtWork, Post.artwork_id == ArtWork.id)
+            .where(ArtWork.aid == aid, ArtWork.type == type)
+            .order_by(Post.post_date.asc())
+        ).all()
+    return [telegram_link.format(cid=cid, post_id=pid) for pid, cid in rows]
 
 
-def get_user_data(update: Update) -> UserData | None:
+def get_user_data(update: Update, context: CallbackContext) -> UserData | None:
     """Get current user's current data
 
     Args:
         update (Update): current update
+        context (CallbackContext): current context
 
     Returns:
         UserData | None: current user's current data
     """
     with Session(engine) as s:
-        if u := s.get(User, update.effective_chat.id):
+        # load channel in the same query
+        if u := s.get(
+            User, update.effective_chat.id, options=[joinedload(User.channel)]
+        ):
             data = UserData(
                 u.forward_mode,
                 u.reply_mode,
                 u.media_mode,
                 u.pixiv_style,
                 u.twitter_style,
-                u.last_info,
+                context.user_data.get("last_info"),
             )
             if u.forward_mode:
                 if not (channel := u.channel):
@@ -556,7 +814,8 @@ def toggler(update: Update, attr: str) -> bool:
         bool: new state
     """
     with Session(engine) as s:
-        u = s.get(User, update.effective_chat.id)
+        # lock user row so concurrent toggles don't read the same state
+        u = s.get(User, update.effective_chat.id, with_for_update=True)
         state = not getattr(u, attr)
         setattr(u, attr, state)
         s.commit()
@@ -564,25 +823,29 @@ def toggler(update: Update, attr: str) -> bool:
         return state
 
 
-def pixiv_save(update: Update, art: dict) -> None:
-    """Save current art media data to user's last_info
+def pixiv_save(
+    update: Update, context: CallbackContext, art: ArtWorkMedia
+) -> None:
+    """Save current artwork data to user's last_info
 
     Args:
         update (Update): current update
-        art (dict): art media dictionary
+        context (CallbackContext): current context
+        art (ArtWorkMedia): artwork object
     """
     notify(update, func="pixiv_save")
-    with Session(engine) as s:
-        u = s.get(User, update.effective_chat.id)
-        art["message_id"] = update.effective_message.message_id
-        u.last_info = art
-        s.commit()
+    info = art._asdict()
+    # thumbnails aren't used to post chosen illustrations
+    del info["thumbs"]
+    info["message_id"] = update.effective_message.message_id
+    # kept in memory: most users never choose illustrations
+    context.user_data["last_info"] = info
     log.debug("Pixiv: Added last info to user [%d].", update.effective_chat.id)
     # prompt user to choose illustrations
     _reply(
         update,
         "Please, choose illustrations to download\\: "
-        f'\\[`1`\\-`{len(art["links"])}`\\]\\.',
+        f"\\[`1`\\-`{len(art.links)}`\\]\\.",
     )
 
 
@@ -614,7 +877,7 @@ def command_start(update: Update, _) -> None:
 def command_help(update: Update, _) -> None:
     """Send a message when the command /help is issued."""
     notify(update, command="/help")
-    _reply(update, Path(os.getenv("HELP_FILE")).read_text(encoding="utf-8"))
+    _reply(update, HELP_TEXT)
 
 
 def command_channel(update: Update, context: CallbackContext) -> int:
@@ -680,27 +943,13 @@ def command_pixiv_style(update: Update, _) -> None:
     notify(update, command="/pixiv_style")
     # get old and new styles
     with Session(engine) as s:
-        u = s.get(User, update.effective_chat.id)
+        # lock user row so concurrent changes don't skip a style
+        u = s.get(User, update.effective_chat.id, with_for_update=True)
         style = PixivStyle.styles[(u.pixiv_style + 1) % len(PixivStyle.styles)]
         u.pixiv_style = style
         s.commit()
     # demonstrate new style
-    link = esc("https://www.pixiv.net/")
-    match style:
-        case PixivStyle.IMAGE_LINK:
-            style = "\\[ `Image(s)` \\]\n\nLink"
-        case PixivStyle.IMAGE_INFO_LINK:
-            style = "\\[ `Image(s)` \\]\n\nTitle \\| Author\nLink"
-        case PixivStyle.IMAGE_INFO_EMBED_LINK:
-            style = f"\\[ `Image(s)` \\]\n\n[Title \\| Author]({link})"
-        case PixivStyle.IMAGE_INFO_EMBED_LINK_DESC:
-            style = f"\\[ `Image(s)` \\]\n\n[Author \\| @Username]({link})\n\n*Title*\n\nDescription"
-        case PixivStyle.INFO_LINK:
-            style = "Artwork \\| Author\nLink"
-        case PixivStyle.INFO_EMBED_LINK:
-            style = f"[Artwork \\| Author]({link})"
-        case _:
-            style = "Unknown"
+    style = demo_dict[LinkType.PIXIV].get(style, "Unknown")
     _reply(update, f"_Pixiv style has been changed to_\\:\n\n{style}")
 
 
@@ -709,27 +958,15 @@ def command_twitter_style(update: Update, _) -> None:
     notify(update, command="/twitter_style")
     # get old and new styles
     with Session(engine) as s:
-        u = s.get(User, update.effective_chat.id)
+        # lock user row so concurrent changes don't skip a style
+        u = s.get(User, update.effective_chat.id, with_for_update=True)
         style = TwitterStyle.styles[
             (u.twitter_style + 1) % len(TwitterStyle.styles)
         ]
         u.twitter_style = style
         s.commit()
     # demonstrate new style
-    link = esc("https://twitter.com/")
-    match style:
-        case TwitterStyle.LINK:
-            style = "Link"
-        case TwitterStyle.IMAGE_LINK:
-            style = "\\[ `Image(s)` \\]\n\nLink"
-        case TwitterStyle.IMAGE_LINK_DESC:
-            style = "\\[ `Image(s)` \\]\n\nLink\n\nDescription"
-        case TwitterStyle.IMAGE_INFO_EMBED_LINK:
-            style = f"\\[ `Image(s)` \\]\n\n[Author \\| @Username]({link})"
-        case TwitterStyle.IMAGE_INFO_EMBED_LINK_DESC:
-            style = f"\\[ `Image(s)` \\]\n\n[Author \\| @Username]({link})\n\nDescription"
-        case _:
-            style = "Unknown"
+    style = demo_dict[LinkType.TWITTER].get(style, "Unknown")
     _reply(update, f"_Twitter style has been changed to_\\:\n\n{style}")
 
 
@@ -738,18 +975,25 @@ def command_twitter_style(update: Update, _) -> None:
 ################################################################################
 
 
-def get_text(update: Update):
+def get_text(update: Update) -> str:
+    """Get message text, caption and entity links joined in one string
+
+    Args:
+        update (Update): current update
+
+    Returns:
+        str: joined text
+    """
+    message = update.effective_message
     return "|".join(
         text
-        for text in [
-            update.effective_message.text,
-            update.effective_message.caption,
-        ]
-        + [
-            entity.url
-            for entity in update.effective_message.entities
-            + update.effective_message.caption_entities
-        ]
+        for text in chain(
+            (message.text, message.caption),
+            (
+                entity.url
+                for entity in chain(message.entities, message.caption_entities)
+            ),
+        )
         if text
     )
 
@@ -770,28 +1014,27 @@ def pixiv_parse(
     text: str,
 ) -> None:
     notify(update, func="pixiv_parse")
-    # speed up
-    art = data.info
+    # restore saved artwork
+    art = ArtWorkMedia(**data.info)
     # initial data
-    count = len(art["links"])
-    ids = []
-    for number in re.finditer(pixiv_number, text):
+    count = len(art.links)
+    ids = {}
+    for number in pixiv_number.finditer(text):
         n1 = int(number.group("n1"))
         if n2 := number.group("n2"):
             n2 = int(n2)
         else:
             n2 = n1
-        if n1 > n2:
-            ids += reversed(range(n2, n1 + 1))
-        else:
-            ids += range(n1, n2 + 1)
-    ids = list(dict.fromkeys(ids))
-    if len(ids) > 10:
-        _error(update, "You *can\\'t* choose more than 10 files\\!")
-        return log.error("Pixiv: Can't choose more than 10 files.")
-    if max(ids) > count or min(ids) < 1:
-        _error(update, f"*Not within* range: \\[`1`\\-`{count}`\\]\\!")
-        return log.error("Pixiv: Not within range: [1-%d].", count)
+        # check bounds before expanding range
+        if max(n1, n2) > count or min(n1, n2) < 1:
+            _error(update, f"*Not within* range: \\[`1`\\-`{count}`\\]\\!")
+            return log.error("Pixiv: Not within range: [1-%d].", count)
+        step = -1 if n1 > n2 else 1
+        ids.update(dict.fromkeys(range(n1, n2 + step, step)))
+        if len(ids) > 10:
+            _error(update, "You *can\\'t* choose more than 10 files\\!")
+            return log.error("Pixiv: Can't choose more than 10 files.")
+    ids = list(ids)
     log.debug("Pixiv: Chosen artworks: %r.", ids)
     # save for reuse
     com = {"context": context, "info": art, "order": ids}
@@ -801,15 +1044,12 @@ def pixiv_parse(
         "is_forwarded": False,
     }
     artwork = {
-        "aid": art["id"],
-        "type": art["type"],
+        "aid": art.id,
+        "type": art.type,
     }
-    if not (a := get_artwork(**artwork)):
+    # log new content in every mode
+    if not artwork_exists(art.id, art.type):
         notify(update, art=art)
-        artwork["files"] = extract_media_ids(art)
-        a = ArtWork(**artwork)
-        post["is_original"] = True
-        log.debug("Pixiv: ArtWork to insert: %s.", artwork)
     if data.forward:
         if not (
             posted := send_media(**com, style=data.pixiv, chat_id=data.chan)
@@ -817,8 +1057,9 @@ def pixiv_parse(
             _error(update, "Coudn't post\\!")
             return log.error("Pixiv: Couldn't post.")
         log.info("Pixiv: Successfully posted to channel.")
+        sent = None
         if not isinstance(posted, Message):
-            posted = posted[0]
+            sent, posted = posted, posted[0]
         post.update(
             {
                 "post_id": posted.message_id,
@@ -826,29 +1067,92 @@ def pixiv_parse(
             }
         )
         with Session(engine) as s:
+            if not (a := get_artwork(**artwork, session=s)):
+                artwork["files"] = extract_media_ids(art)
+                a = ArtWork(**artwork)
+                post["is_original"] = True
+                log.debug("Pixiv: ArtWork to insert: %s.", artwork)
             s.add(Post(**post, artwork=a))
             s.commit()
             log.debug("Pixiv: Inserted Post: %s.", post)
         if data.reply:
-            send_media(**com, **rep(update), style=data.pixiv)
-            _post(
-                update,
-                "posted",
-                data.chan,
-                posted.message_id,
-                art["link"],
+            send_media(
+                **com,
+                **rep(update),
+                style=data.pixiv,
+                note=post_text(
+                    "posted", data.chan, posted.message_id, art.link
+                ),
+                sent=sent,
             )
     else:
         if data.reply:
             send_media(**com, **rep(update), style=data.pixiv)
         send_media_doc(**com, **rep(update))
-    # upload to cloud
-    upload_media(info=art, order=ids, user=update.effective_chat.id)
     # clean last_info for user
-    with Session(engine) as s:
-        u = s.get(User, update.effective_chat.id)
-        u.last_info = None
-        s.commit()
+    context.user_data.pop("last_info", None)
+    # upload to cloud
+    submit_upload_media(art, user=update.effective_chat.id, order=ids)
+
+
+def reply_twitter(
+    update: Update,
+    context: CallbackContext,
+    data: UserData,
+    art: ArtWorkMedia,
+) -> bool:
+    """Reply with twitter artwork
+
+    Args:
+        update (Update): current update
+        context (CallbackContext): current context
+        data (UserData): current user's current data
+        art (ArtWorkMedia): artwork object
+
+    Returns:
+        bool: True if artwork was sent
+    """
+    com = {"context": context, "info": art, **rep(update)}
+    if data.reply:
+        send_media(**com, style=data.twitter)
+    send_media_doc(**com)
+    return True
+
+
+def reply_pixiv(
+    update: Update,
+    context: CallbackContext,
+    data: UserData,
+    art: ArtWorkMedia,
+) -> bool:
+    """Reply with pixiv artwork or ask user to choose illustrations
+
+    Args:
+        update (Update): current update
+        context (CallbackContext): current context
+        data (UserData): current user's current data
+        art (ArtWorkMedia): artwork object
+
+    Returns:
+        bool: True if artwork was sent
+    """
+    if len(art.links) > 1:
+        log.info("No Forward: There's more than 1 artwork.")
+        pixiv_save(update, context, art)
+        return False
+    log.info("No Forward: There's only 1 artwork.")
+    com = {"context": context, "info": art, **rep(update)}
+    if data.reply:
+        send_media(**com, style=data.pixiv)
+    send_media_doc(**com)
+    return True
+
+
+# replying handlers
+reply_handlers = {
+    LinkType.TWITTER: reply_twitter,
+    LinkType.PIXIV: reply_pixiv,
+}
 
 
 def no_forwarding(
@@ -859,8 +1163,8 @@ def no_forwarding(
 ) -> None:
     notify(update, func="no_forwarding")
     # process links
-    for link in links:
-        if not (art := get_links(link)):
+    for link, art in zip(links, get_links_batch(links)):
+        if not art:
             _error(
                 update,
                 f"[This content]({link.link}) can\\'t be found or "
@@ -868,27 +1172,11 @@ def no_forwarding(
             )
             log.error("No Forward: Couldn't get content: %r.", link.link)
             continue
-        art = art._asdict()
         notify(update, art=art)
-        com = {"context": context, "info": art, **rep(update)}
-        match link.type:
-            # twitter links
-            case LinkType.TWITTER:
-                if data.reply:
-                    send_media(**com, style=data.twitter)
-                send_media_doc(**com)
-            # one pixiv link
-            case LinkType.PIXIV:
-                if len(art["links"]) > 1:
-                    log.info("No Forward: There's more than 1 artwork.")
-                    pixiv_save(update, art)
-                    return
-                log.info("No Forward: There's only 1 artwork.")
-                if data.reply:
-                    send_media(**com, style=data.pixiv)
-                send_media_doc(**com)
+        if not reply_handlers[link.type](update, context, data, art):
+            return
         # upload to cloud
-        upload_media(art, user=update.effective_chat.id)
+        submit_upload_media(art, user=update.effective_chat.id)
 
 
 def just_forwarding(
@@ -899,7 +1187,7 @@ def just_forwarding(
 ) -> None:
     notify(update, func="just_forwarding")
     # check if media group message
-    if getattr(update.effective_message, "media_group_id"):
+    if update.effective_message.media_group_id:
         log.error("Forward: Bots can't forward media groups.")
         return _error(
             update,
@@ -920,66 +1208,208 @@ def just_forwarding(
         "is_forwarded": True,
     }
     artwork = {"aid": link.id, "type": link.type}
-    # can be ignored for this one
-    if art := get_links(link):
-        art = art._asdict()
-        notify(update, art=art)
-    if not (a := get_artwork(**artwork)):
-        if art:
-            artwork["files"] = extract_media_ids(art)
-        else:
-            log.warning("Forward: Couldn't get content: %r.", link.link)
-        a = ArtWork(**artwork)
-        log.debug("Forward: ArtWork to insert: %s.", artwork)
-    # check if it's forwarded from channel in database
-    with Session(engine) as s:
-        if src := update.effective_message.forward_from_chat:
-            if c := s.get(Channel, src.id):
-                post["forwarded_channel_id"] = c.id
-                log.info("Forward: Source: %r [%d].", c.name, c.cid)
-                if c.id == data.chan:
-                    log.error("Forward: Self-forwarding is no allowed.")
-                    return _error(update, "You shouldn't *self\\-forward*\\!")
-            else:
-                log.info("Forward: Source: unknown.")
-        else:
-            log.info("Forward: Source: not a channel.")
-    # just forward it
-    if posted := forward(update, data.chan):
-        log.info("Forward: Successfully forwarded to channel.")
-        post.update(
-            {
-                "post_id": posted.message_id,
-                "post_date": posted.date,
-            }
-        )
+    # artwork is looked up and inserted while held
+    with lock_artworks((link.id, link.type)):
+        # check if it's forwarded from channel in database before fetching
         with Session(engine) as s:
-            s.add(Post(**post, artwork=a))
-            s.commit()
-            log.debug("Forward: Inserted Post: %s.", post)
-        if data.reply:
-            _post(
-                update,
-                "forwarded",
-                data.chan,
-                posted.message_id,
-                art["link"] if art else link.link,
-            )
-        if data.media and not check_message_media(update):
+            if src := update.effective_message.forward_from_chat:
+                if c := s.get(Channel, src.id):
+                    post["forwarded_channel_id"] = c.id
+                    log.info("Forward: Source: %r [%d].", c.name, c.cid)
+                    if c.id == data.chan:
+                        log.error("Forward: Self-forwarding is no allowed.")
+                        return _error(
+                            update, "You shouldn't *self\\-forward*\\!"
+                        )
+                else:
+                    log.info("Forward: Source: unknown.")
+            else:
+                log.info("Forward: Source: not a channel.")
+            a = get_artwork(**artwork, session=s)
+        # can be ignored for this one
+        if art := get_links(link):
+            notify(update, art=art)
+        if not a:
             if art:
-                if send_media_doc(
-                    context=context,
-                    info=art,
-                    media_filter=["video", "animated_gif"],
-                    chat_id=data.chan,
-                    reply_to_message_id=posted.message_id,
-                ):
-                    log.info("Forward: Successfully replied with media.")
+                artwork["files"] = extract_media_ids(art)
             else:
-                _error(update, "*Media mode*\\: Couldn't get this content\\!")
-                log.warning("Forward: Couldn't reply with media.")
+                log.warning("Forward: Couldn't get content: %r.", link.link)
+            a = ArtWork(**artwork)
+            log.debug("Forward: ArtWork to insert: %s.", artwork)
+        # just forward it
+        if posted := forward(update, data.chan):
+            log.info("Forward: Successfully forwarded to channel.")
+            post.update(
+                {
+                    "post_id": posted.message_id,
+                    "post_date": posted.date,
+                }
+            )
+            with Session(engine) as s:
+                s.add(Post(**post, artwork=a))
+                s.commit()
+                log.debug("Forward: Inserted Post: %s.", post)
+            if data.reply:
+                _post(
+                    update,
+                    "forwarded",
+                    data.chan,
+                    posted.message_id,
+                    art.link if art else link.link,
+                )
+            if data.media and not check_message_media(update):
+                if art:
+                    if send_media_doc(
+                        context=context,
+                        info=art,
+                        media_filter=video_types,
+                        chat_id=data.chan,
+                        reply_to_message_id=posted.message_id,
+                    ):
+                        log.info("Forward: Successfully replied with media.")
+                else:
+                    _error(
+                        update, "*Media mode*\\: Couldn't get this content\\!"
+                    )
+                    log.warning("Forward: Couldn't reply with media.")
     # upload to cloud
-    upload_media(art, user=update.effective_chat.id)
+    submit_upload_media(art, user=update.effective_chat.id)
+
+
+def post_twitter(
+    update: Update,
+    context: CallbackContext,
+    data: UserData,
+    art: ArtWorkMedia,
+    post: dict,
+    artwork: ArtWork = None,
+    posts: list[Post] = None,
+) -> int:
+    """Post twitter artwork to channel
+
+    Args:
+        update (Update): current update
+        context (CallbackContext): current context
+        data (UserData): current user's current data
+        art (ArtWorkMedia): artwork object
+        post (dict): post data to insert
+        artwork (ArtWork, optional): new artwork of the post. Defaults to None.
+        posts (list[Post], optional): collect post instead of inserting it.
+        Defaults to None.
+
+    Returns:
+        int: result message index
+    """
+    com = {"context": context, "info": art}
+    if not (
+        posted := send_media(**com, style=data.twitter, chat_id=data.chan)
+    ):
+        log.error("Post: Couldn't post.")
+        return 2
+    log.info("Post: Successfully posted to channel.")
+    if not isinstance(posted, Message):
+        posted = posted[0]
+    post.update(
+        {
+            "post_id": posted.message_id,
+            "post_date": posted.date,
+        }
+    )
+    if posts is not None:
+        posts.append(Post(**post, artwork=artwork))
+        log.debug("Post: Post to insert: %s.", post)
+    else:
+        with Session(engine) as s:
+            # already posted artwork is looked up in the same session
+            artwork = artwork or get_artwork(art.id, art.type, s)
+            s.add(Post(**post, artwork=artwork))
+            s.commit()
+            log.debug("Post: Inserted Post: %s.", post)
+    if data.reply:
+        _post(update, "posted", data.chan, posted.message_id, art.link)
+    if data.media and data.twitter == TwitterStyle.LINK:
+        send_media_doc(
+            **com,
+            media_filter=video_types,
+            chat_id=data.chan,
+            reply_to_message_id=posted.message_id,
+        )
+    return 0
+
+
+def post_pixiv(
+    update: Update,
+    context: CallbackContext,
+    data: UserData,
+    art: ArtWorkMedia,
+    post: dict,
+    artwork: ArtWork = None,
+    posts: list[Post] = None,
+) -> int:
+    """Post pixiv artwork to channel or ask user to choose illustrations
+
+    Args:
+        update (Update): current update
+        context (CallbackContext): current context
+        data (UserData): current user's current data
+        art (ArtWorkMedia): artwork object
+        post (dict): post data to insert
+        artwork (ArtWork, optional): new artwork of the post. Defaults to None.
+        posts (list[Post], optional): collect post instead of inserting it.
+        Defaults to None.
+
+    Returns:
+        int: result message index
+    """
+    if not (
+        len(art.links) == 1
+        or data.pixiv == PixivStyle.INFO_LINK
+        or data.pixiv == PixivStyle.INFO_EMBED_LINK
+    ):
+        pixiv_save(update, context, art)
+        return 1
+    com = {"context": context, "info": art}
+    if not (
+        posted := send_media(**com, style=data.pixiv, chat_id=data.chan)
+    ):
+        log.error("Post: Couldn't post.")
+        return 2
+    log.info("Post: Successfully posted to channel.")
+    sent = None
+    if not isinstance(posted, Message):
+        sent, posted = posted, posted[0]
+    post.update(
+        {
+            "post_id": posted.message_id,
+            "post_date": posted.date,
+        }
+    )
+    if posts is not None:
+        posts.append(Post(**post, artwork=artwork))
+        log.debug("Post: Post to insert: %s.", post)
+    else:
+        with Session(engine) as s:
+            # already posted artwork is looked up in the same session
+            artwork = artwork or get_artwork(art.id, art.type, s)
+            s.add(Post(**post, artwork=artwork))
+            s.commit()
+            log.debug("Post: Inserted Post: %s.", post)
+    if data.reply:
+        send_media(
+            **com,
+            **rep(update),
+            style=data.pixiv,
+            note=post_text("posted", data.chan, posted.message_id, art.link),
+            sent=sent,
+        )
+    return 0
+
+
+# posting handlers
+post_handlers = {
+    LinkType.TWITTER: post_twitter,
+    LinkType.PIXIV: post_pixiv,
+}
 
 
 def just_posting(
@@ -989,106 +1419,56 @@ def just_posting(
     links: list[Link],
 ) -> None:
     notify(update, func="just_posting")
-    # process links
-    for link in links:
-        if get_artwork(link.id, link.type):
-            log.warning("Post: Content is not original: %r.", link.link)
-            _warn(update, link)
-            continue
-        post = {
-            "channel_id": data.chan,
-            "is_original": True,
-            "is_forwarded": False,
-        }
-        if not (art := get_links(link)):
-            _error(
-                update,
-                f"[This content]({link.link}) can\\'t be found or "
-                "downloaded\\. If this seems to be wrong, try again later\\.",
-            )
-            log.error("Post: Couldn't get content: %r.", link.link)
-            continue
-        art = art._asdict()
-        notify(update, art=art)
-        artwork = {
-            "aid": link.id,
-            "type": link.type,
-            "files": extract_media_ids(art),
-        }
-        com = {"context": context, "info": art}
-        match link.type:
-            # twitter links
-            case LinkType.TWITTER:
-                if posted := send_media(
-                    **com, style=data.twitter, chat_id=data.chan
-                ):
-                    log.info("Post: Successfully forwarded to channel.")
-                    if not isinstance(posted, Message):
-                        posted = posted[0]
-                    post.update(
-                        {
-                            "post_id": posted.message_id,
-                            "post_date": posted.date,
-                        }
+    # same artworks from other messages wait until these are inserted
+    with lock_artworks(*((link.id, link.type) for link in links)):
+        # skip already posted links before fetching
+        fresh = {}
+        for link in links:
+            if (link.type, link.id) in fresh:
+                log.info("Post: Duplicate link in message: %r.", link.link)
+                continue
+            if artwork_exists(link.id, link.type):
+                log.warning("Post: Content is not original: %r.", link.link)
+                _warn(update, link)
+                continue
+            fresh[link.type, link.id] = link
+        fresh = list(fresh.values())
+        # process links, new posts are inserted at once
+        posts = []
+        try:
+            for link, art in zip(fresh, get_links_batch(fresh)):
+                if not art:
+                    _error(
+                        update,
+                        f"[This content]({link.link}) can\\'t be found or "
+                        "downloaded\\. If this seems to be wrong, "
+                        "try again later\\.",
                     )
-                    with Session(engine) as s:
-                        s.add(Post(**post, artwork=ArtWork(**artwork)))
-                        s.commit()
-                        log.debug("Post: Inserted ArtWork: %s.", artwork)
-                        log.debug("Post: Inserted Post: %s.", post)
-                    if data.reply:
-                        _post(
-                            update,
-                            "posted",
-                            data.chan,
-                            posted.message_id,
-                            art["link"],
-                        )
-                    if data.media and data.twitter == TwitterStyle.LINK:
-                        send_media_doc(
-                            **com,
-                            media_filter=["video", "animated_gif"],
-                            chat_id=data.chan,
-                            reply_to_message_id=posted.message_id,
-                        )
-            # pixiv links
-            case LinkType.PIXIV:
-                if (
-                    len(art["links"]) == 1
-                    or data.pixiv == PixivStyle.INFO_LINK
-                    or data.pixiv == PixivStyle.INFO_EMBED_LINK
+                    log.error("Post: Couldn't get content: %r.", link.link)
+                    continue
+                notify(update, art=art)
+                post = {
+                    "channel_id": data.chan,
+                    "is_original": True,
+                    "is_forwarded": False,
+                }
+                artwork = {
+                    "aid": link.id,
+                    "type": link.type,
+                    "files": extract_media_ids(art),
+                }
+                log.debug("Post: ArtWork to insert: %s.", artwork)
+                handler = post_handlers[link.type]
+                if handler(
+                    update, context, data, art, post, ArtWork(**artwork), posts
                 ):
-                    if posted := send_media(
-                        **com, style=data.pixiv, chat_id=data.chan
-                    ):
-                        log.info("Post: Successfully forwarded to channel.")
-                        if not isinstance(posted, Message):
-                            posted = posted[0]
-                        post.update(
-                            {
-                                "post_id": posted.message_id,
-                                "post_date": posted.date,
-                            }
-                        )
-                        with Session(engine) as s:
-                            s.add(Post(**post, artwork=ArtWork(**artwork)))
-                            s.commit()
-                            log.debug("Post: Inserted ArtWork: %s.", artwork)
-                            log.debug("Post: Inserted Post: %s.", post)
-                        if data.reply:
-                            send_media(**com, **rep(update), style=data.pixiv)
-                            _post(
-                                update,
-                                "posted",
-                                data.chan,
-                                posted.message_id,
-                                art["link"],
-                            )
-                else:
-                    pixiv_save(update, art)
                     continue
-        # upload to cloud
-        upload_media(art, user=update.effective_chat.id)
+                # upload to cloud
+                submit_upload_media(art, user=update.effective_chat.id)
+        finally:
+            # keep whatever was posted even if a later link failed
+            if posts:
+                insert_posts(posts)
 
 
 def universal(update: Update, context: CallbackContext) -> None:
@@ -1100,14 +1480,19 @@ def universal(update: Update, context: CallbackContext) -> None:
     """
     notify(update, command="universal")
     # get user data
-    if not (data := get_user_data(update)):
+    if not (data := get_user_data(update, context)):
         return log.error("Universal: No data: [%d].", update.effective_chat.id)
     # check for text
     if not (text := get_text(update)):
-        log.info("Universal: Received update: %r.", update)
+        log.debug("Universal: Received update: %r.", update)
         # no text found!
         return log.error("Universal: No text.")
     log.debug("Universal: Received text: %r.", text)
+    # plain chat: no links and no illustrations to choose
+    if not data.info and not any(host in text for host in link_hosts):
+        return log.info(
+            "Universal: No idea what to do with message: %r.", text
+        )
     # check for links
     if links := formatter(text):
         if len(links) > 1:
@@ -1122,7 +1507,7 @@ def universal(update: Update, context: CallbackContext) -> None:
                 just_forwarding(update, context, data, links)
             else:
                 just_posting(update, context, data, links)
-    elif data.info and re.search(pixiv_regex, text):
+    elif data.info and pixiv_regex.search(text):
         pixiv_parse(update, context, data, text)
     else:
         log.info("Universal: No idea what to do with message: %r.", text)
@@ -1131,7 +1516,7 @@ def universal(update: Update, context: CallbackContext) -> None:
 def answer_query(update: Update, context: CallbackContext) -> None:
     notify(update, command="answer_query")
     # get user data
-    if not (data := get_user_data(update)):
+    if not (data := get_user_data(update, context)):
         return log.error("Query: No data: [%d].", update.effective_chat.id)
     # check for forward mode
     if not data.forward:
@@ -1142,7 +1527,7 @@ def answer_query(update: Update, context: CallbackContext) -> None:
     # get message info
     links = update.effective_message.entities
     link, posted = links[0], links[1:-3]
-    text = ", and ".join([f"[here]({esc(post['url'])})" for post in posted])
+    text = ", and ".join(f"[here]({esc(post['url'])})" for post in posted)
     post = {
         "channel_id": data.chan,
         "is_original": False,
@@ -1155,93 +1540,17 @@ def answer_query(update: Update, context: CallbackContext) -> None:
             "downloaded\\. If this seems to be wrong, try again later\\.",
         )
         return log.error("Query: Couldn't get content: %r.", link["url"])
-    art = art._asdict()
     notify(update, art=art)
-    post["artwork"] = get_artwork(art["id"], art["type"])
-    com = {"context": context, "info": art}
-    match art["type"]:
-        # twitter links
-        case LinkType.TWITTER:
-            if posted := send_media(
-                **com, style=data.twitter, chat_id=data.chan
-            ):
-                log.info("Query: Successfully posted to channel.")
-                if not isinstance(posted, Message):
-                    posted = posted[0]
-                post.update(
-                    {
-                        "post_id": posted.message_id,
-                        "post_date": posted.date,
-                    }
-                )
-                with Session(engine) as s:
-                    s.add(Post(**post))
-                    s.commit()
-                    log.debug("Query: Inserted Post: %s.", post)
-                if data.reply:
-                    _post(
-                        update,
-                        "posted",
-                        data.chan,
-                        posted.message_id,
-                        art["link"],
-                    )
-                if data.media and data.twitter == TwitterStyle.LINK:
-                    send_media_doc(
-                        **com,
-                        media_filter=["video", "animated_gif"],
-                        chat_id=data.chan,
-                        reply_to_message_id=posted.message_id,
-                    )
-                result = 0
-            else:
-                result = 2
-        # pixiv links
-        case LinkType.PIXIV:
-            if (
-                len(art["links"]) == 1
-                or data.pixiv == PixivStyle.INFO_LINK
-                or data.pixiv == PixivStyle.INFO_EMBED_LINK
-            ):
-                if posted := send_media(
-                    **com, style=data.pixiv, chat_id=data.chan
-                ):
-                    log.info("Query: Successfully posted to channel.")
-                    if not isinstance(posted, Message):
-                        posted = posted[0]
-                    post.update(
-                        {
-                            "post_id": posted.message_id,
-                            "post_date": posted.date,
-                        }
-                    )
-                    with Session(engine) as s:
-                        s.add(Post(**post))
-                        s.commit()
-                        log.debug("Query: Inserted Post: %s.", post)
-                    if data.reply:
-                        send_media(**com, **rep(update), style=data.pixiv)
-                        _post(
-                            update,
-                            "posted",
-                            data.chan,
-                            posted.message_id,
-                            art["link"],
-                        )
-                    result = 0
-                else:
-                    result = 2
-            else:
-                pixiv_save(update, art)
-                result = 1
+    art_link = esc(art.link)
+    result = post_handlers[art.type](update, context, data, art, post)
     update.effective_message.edit_text(
-        f'~This [artwork]({esc(art["link"])}) was already posted\\: {text}~\\.'
+        f"~This [artwork]({art_link}) was already posted\\: {text}~\\."
         f"\n\n{result_message[result]}",
         parse_mode=MDV2,
     )
     # upload to cloud
     if not result:
-        upload_media(art, user=update.effective_chat.id)
+        submit_upload_media(art, user=update.effective_chat.id)
 
 
 def handle_post(update: Update, _) -> None:
@@ -1250,7 +1559,7 @@ def handle_post(update: Update, _) -> None:
     message = update.effective_message
     # check for text
     if not (text := get_text(update)):
-        log.info("Handle Post: Received update: %r.", update)
+        log.debug("Handle Post: Received update: %r.", update)
         # no text found!
         return log.error("Handle Post: No text.")
     log.debug("Handle Post: Received text: %r.", text)
@@ -1269,19 +1578,9 @@ def handle_post(update: Update, _) -> None:
             artwork = {"aid": link.id, "type": link.type}
             # can be ignored for this one
             if art := get_links(link):
-                art = art._asdict()
                 notify(update, art=art)
-            if not (a := get_artwork(**artwork)):
-                if art:
-                    artwork["files"] = extract_media_ids(art)
-                else:
-                    log.warning(
-                        "Handle Post: Couldn't get content: %r.", link.link
-                    )
-                a = ArtWork(**artwork)
-                log.debug("Handle Post: ArtWork to insert: %s.", artwork)
-                post["is_original"] = True
-            with Session(engine) as s:
+            # wait for the bot's own posting of this artwork to be inserted
+            with lock_artworks((link.id, link.type)), Session(engine) as s:
                 if (
                     s.query(Post)
                     .filter_by(channel_id=update.effective_chat.id)
@@ -1290,6 +1589,16 @@ def handle_post(update: Update, _) -> None:
                 ):
                     log.info("Handle Post: Already in database. Skipping...")
                     return
+                if not (a := get_artwork(**artwork, session=s)):
+                    if art:
+                        artwork["files"] = extract_media_ids(art)
+                    else:
+                        log.warning(
+                            "Handle Post: Couldn't get content: %r.", link.link
+                        )
+                    a = ArtWork(**artwork)
+                    log.debug("Handle Post: ArtWork to insert: %s.", artwork)
+                    post["is_original"] = True
                 if src := message.forward_from_chat:
                     if c := s.get(Channel, src.id):
                         post["forwarded_channel_id"] = c.id
@@ -1312,15 +1621,19 @@ def handle_post(update: Update, _) -> None:
 
 def main() -> None:
     """Set up and run the bot"""
+    # bot waiting for telegram flood limits
+    bot = LimitedBot(TOKEN, request=Request(con_pool_size=WORKERS + 4))
+
     # create updater & dispatcher
-    updater = Updater(os.getenv("TOKEN"))
+    updater = Updater(bot=bot, workers=WORKERS)
 
     # start bot
     updater.start_webhook(
         listen="0.0.0.0",
-        port=int(os.getenv("PORT", "8443")),
-        url_path=os.getenv("TOKEN"),
-        webhook_url=f"https://{os.environ['APP_NAME']}.herokuapp.com/{os.environ['TOKEN']}",
+        port=PORT,
+        url_path=TOKEN,
+        webhook_url=WEBHOOK_URL,
+        drop_pending_updates=True,
     )
     dispatcher = updater.dispatcher
 
@@ -1329,6 +1642,7 @@ def main() -> None:
         CommandHandler(
             "start",
             command_start,
+            run_async=True,
         )
     )
 
@@ -1337,6 +1651,7 @@ def main() -> None:
         CommandHandler(
             "help",
             command_help,
+            run_async=True,
         )
     )
 
@@ -1345,6 +1660,7 @@ def main() -> None:
         CommandHandler(
             "forward",
             command_forward,
+            run_async=True,
         )
     )
 
@@ -1353,6 +1669,7 @@ def main() -> None:
         CommandHandler(
             "reply",
             command_reply,
+            run_async=True,
         )
     )
 
@@ -1361,6 +1678,7 @@ def main() -> None:
         CommandHandler(
             "media",
             command_media,
+            run_async=True,
         )
     )
 
@@ -1369,6 +1687,7 @@ def main() -> None:
         CommandHandler(
             "pixiv_style",
             command_pixiv_style,
+            run_async=True,
         )
     )
 
@@ -1377,11 +1696,14 @@ def main() -> None:
         CommandHandler(
             "twitter_style",
             command_twitter_style,
+            run_async=True,
         )
     )
 
-    channel_handler = CommandHandler("channel", command_channel)
-    cancel_handler = CommandHandler("cancel", command_cancel)
+    channel_handler = CommandHandler(
+        "channel", command_channel, run_async=True
+    )
+    cancel_handler = CommandHandler("cancel", command_cancel, run_async=True)
 
     # add your channel
     dispatcher.add_handler(
@@ -1395,6 +1717,7 @@ def main() -> None:
                     MessageHandler(
                         Filters.chat_type.private & ~Filters.command,
                         channel_check,
+                        run_async=True,
                     ),
                 ]
             },
@@ -1412,11 +1735,12 @@ def main() -> None:
             & ~Filters.command
             & ~Filters.update.edited_message,
             universal,
+            run_async=True,
         )
     )
 
     # handle force posting
-    dispatcher.add_handler(CallbackQueryHandler(answer_query))
+    dispatcher.add_handler(CallbackQueryHandler(answer_query, run_async=True))
 
     # handle channels posts
     dispatcher.add_handler(
@@ -1425,11 +1749,14 @@ def main() -> None:
             & ~Filters.command
             & ~Filters.update.edited_channel_post,
             handle_post,
+            run_async=True,
         )
     )
 
     # stop bot
     updater.idle()
+    # finish background uploads
+    upload_pool.shutdown(wait=True)
 
 
 if __name__ == "__main__":